@@ -0,0 +1,213 @@
+import logging
+import sqlite3
+import sys
+
+WORD_HEX = 8
+WORD_MASK = 0xffffffff
+# A range query whose index range holds fewer entries than this is answered
+# from the value index, otherwise by walking the trace in time order.
+DENSE_RANGE = 1000
+
+class ValueIndex():
+    ''' Maps every value written to memory to the log rows that wrote it.
+
+    new_data is stored as hex text made of the 32 bit words printed by gdb's
+    x command, so each word is indexed as an integer together with its
+    byte offset, width and the timestamp of its log row. Lookups then hit
+    the B-trees on write_values instead of scanning logs.
+
+    log_id is the rowid of the log row. Databases created by setup_db have
+    an INTEGER PRIMARY KEY on logs, which keeps it stable; in older ones a
+    VACUUM may renumber the rows, after which the index has to be rebuilt
+    from scratch. '''
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.cursor()
+
+    def setup(self):
+        self.cursor.execute('CREATE TABLE IF NOT EXISTS write_values\
+                (log_id INTEGER,\
+                offset INTEGER,\
+                width INTEGER,\
+                value INTEGER,\
+                timestamp timestamp\
+                )')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS write_values_by_value\
+                ON write_values(value, timestamp, width, log_id)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS write_values_by_time\
+                ON write_values(timestamp, value, width, log_id)')
+        # Highest logs rowid indexed so far
+        self.cursor.execute('CREATE TABLE IF NOT EXISTS write_values_mark\
+                (log_id INTEGER)')
+        if self.cursor.execute('SELECT COUNT(*) FROM write_values_mark')\
+                .fetchone()[0] == 0:
+            self.cursor.execute('INSERT INTO write_values_mark VALUES (0)')
+        self.conn.commit()
+
+    def exists(self):
+        return self.cursor.execute("SELECT COUNT(*) FROM sqlite_master\
+                WHERE type = 'table' AND name = 'write_values_mark'")\
+                .fetchone()[0] == 1
+
+    def mark(self):
+        return self.cursor.execute('SELECT log_id FROM write_values_mark')\
+                .fetchone()[0]
+
+    def add(self, log_id, timestamp, new_data):
+        ''' Index one log row. The caller commits. '''
+        self.cursor.executemany('INSERT INTO write_values VALUES\
+                (?,?,?,?,?)', value_rows(log_id, timestamp, new_data))
+        self.cursor.execute('UPDATE write_values_mark SET log_id = ?',
+                (log_id,))
+
+    def build(self):
+        ''' Index the log rows added since the last build. Return the number
+        of rows indexed. '''
+        count = 0
+        rows = self.conn.execute('SELECT rowid, timestamp, new_data FROM logs\
+                WHERE rowid > ? ORDER BY rowid', (self.mark(),))
+        for log_id, timestamp, new_data in rows:
+            self.add(log_id, timestamp, new_data)
+            count += 1
+
+        self.conn.commit()
+        return count
+
+    def search(self, ts, query, forward=True, limit=50):
+        ''' Return the log rows after (or before) ts whose written value
+        matches query, a (low, high, mask, pattern, width) tuple as returned
+        by parse_query. Rows are in timestamp order. '''
+        low, high, mask, pattern, width = query
+        pattern &= mask
+        # Every value with (value & mask) == pattern lies between pattern
+        # and pattern with all the unmasked bits set, so the mask also
+        # narrows the index range.
+        low = max(low, pattern)
+        high = min(high, pattern | (~mask & WORD_MASK))
+        if (low > high):
+            return []
+
+        if forward:
+            comp, order = '>', 'ASC'
+        else:
+            comp, order = '<', 'DESC'
+
+        # An exact value comes out of write_values_by_value already in time
+        # order, as does a sparse range after sorting a few entries. A dense
+        # range is cheaper to find by walking write_values_by_time from ts
+        # and stopping at the limit.
+        if (low == high):
+            index, cond = 'write_values_by_value', 'value = ?'
+            args = [low]
+        elif (self.range_size(low, high) < DENSE_RANGE):
+            index, cond = 'write_values_by_value', 'value BETWEEN ? AND ?'
+            args = [low, high]
+        else:
+            index, cond = 'write_values_by_time', 'value BETWEEN ? AND ?'
+            args = [low, high]
+
+        sql = 'SELECT log_id FROM write_values INDEXED BY {0}\
+                WHERE {1} AND (value & ?) = ? AND timestamp {2} ?'\
+                .format(index, cond, comp)
+        args.extend([mask, pattern, ts])
+        if (width is not None):
+            sql += ' AND width = ?'
+            args.append(width)
+        sql += ' ORDER BY timestamp {0}'.format(order)
+
+        # One log row can match with several words
+        log_ids = []
+        for (log_id,) in self.conn.execute(sql, args):
+            if log_id not in log_ids:
+                log_ids.append(log_id)
+                if (len(log_ids) == limit):
+                    break
+
+        if not forward:
+            log_ids.reverse()
+
+        return [self.cursor.execute('SELECT * FROM logs WHERE rowid = ?',
+            (log_id,)).fetchone() for log_id in log_ids]
+
+    def range_size(self, low, high):
+        ''' Count the index entries between low and high, up to
+        DENSE_RANGE. '''
+        return self.cursor.execute('SELECT COUNT(*) FROM\
+                (SELECT 1 FROM write_values INDEXED BY write_values_by_value\
+                WHERE value BETWEEN ? AND ? LIMIT ?)',
+                (low, high, DENSE_RANGE)).fetchone()[0]
+
+
+def value_rows(log_id, timestamp, new_data):
+    ''' Split the hex text new_data into (log_id, offset, width, value,
+    timestamp) rows, one per word. '''
+    rows = []
+    if not new_data:
+        return rows
+
+    for i in range(0, len(new_data), WORD_HEX):
+        word = new_data[i:i + WORD_HEX]
+        try:
+            value = int(word, 16)
+        except ValueError as e:
+            logging.error("Cannot index value: {0}".format(str(e)))
+            return []
+        rows.append((log_id, i // 2, len(word) // 2, value, timestamp))
+
+    return rows
+
+
+def parse_int(s, what):
+    try:
+        value = int(s.strip(), 0)
+    except ValueError:
+        raise ValueError("Bad {0}: '{1}'".format(what, s.strip()))
+
+    if (value < 0 or value > WORD_MASK):
+        raise ValueError("{0} out of range: {1}".format(what.capitalize(),
+            s.strip()))
+    return value
+
+
+def parse_query(query):
+    ''' Parse a value query into a (low, high, mask, pattern, width) tuple.
+
+    VALUE           exact match, eg. 0xdeadbeef
+    LOW-HIGH        inclusive range, eg. 0xc1000000-0xc1ffffff
+    PATTERN/MASK    masked match, eg. 0x0/0xfff for bits 0-11 zero
+
+    Any of these can be followed by :WIDTH to only match words of WIDTH
+    bytes, eg. 0xabcd:2. width is None otherwise.
+
+    Raise ValueError if the query cannot be parsed. '''
+    query = query.strip()
+    width = None
+    if ':' in query:
+        query, width = query.split(':', 1)
+        width = parse_int(width, 'width')
+        if (width < 1 or width > WORD_HEX // 2):
+            raise ValueError("Width should be 1 to {0} bytes."
+                    .format(WORD_HEX // 2))
+
+    if '/' in query:
+        pattern, mask = query.split('/', 1)
+        return (0, WORD_MASK, parse_int(mask, 'mask'),
+                parse_int(pattern, 'pattern'), width)
+    elif '-' in query:
+        low, high = query.split('-', 1)
+        low, high = parse_int(low, 'low'), parse_int(high, 'high')
+        if (low > high):
+            raise ValueError("Low is above high.")
+        return low, high, 0, 0, width
+    else:
+        value = parse_int(query, 'value')
+        return value, value, WORD_MASK, value, width
+
+
+if __name__ == "__main__":
+    # Offline pass: index a database recorded without a value index.
+    conn = sqlite3.connect(sys.argv[1])
+    value_index = ValueIndex(conn)
+    value_index.setup()
+    print("Indexed {0} rows.".format(value_index.build()))
@@ -3,6 +3,7 @@
 
 import wx
 from GdbPexpect import GdbPexpect
+from ValueIndex import ValueIndex, parse_query
 import sqlite3
 
 
@@ -14,6 +15,7 @@ class MyFrame(wx.Frame):
         kwds["style"] = wx.DEFAULT_FRAME_STYLE
         wx.Frame.__init__(self, *args, **kwds)
         self.search_box = wx.TextCtrl(self, -1, "", style=wx.TE_PROCESS_ENTER)
+        self.search_mode = wx.Choice(self, -1, choices=["Address", "Value"])
         self.button_backward = wx.Button(self, -1, label="<<", name='backward')
         self.button_forward = wx.Button(self, -1, label=">>", name='forward')
         self.entries_list_box = wx.ListBox(self, -1, choices=[], style=wx.LB_SINGLE)
@@ -32,6 +34,7 @@ class MyFrame(wx.Frame):
     def __init_db(self, database):
         self.conn = sqlite3.connect(database)
         self.cursor = self.conn.cursor()
+        self.value_index = ValueIndex(self.conn)
 
     def __setup_events(self):
         self.button_forward.Bind(wx.EVT_BUTTON, self.search_button_clicked)
@@ -43,6 +46,7 @@ class MyFrame(wx.Frame):
         # begin wxGlade: MyFrame.__set_properties
         self.SetTitle("Query Engine - RRDebug")
         self.search_box.SetMinSize((150, 27))
+        self.search_mode.SetSelection(0)
         # end wxGlade
 
     def __do_layout(self):
@@ -51,6 +55,7 @@ class MyFrame(wx.Frame):
         sizer_3 = wx.BoxSizer(wx.HORIZONTAL)
         sizer_2 = wx.BoxSizer(wx.HORIZONTAL)
         sizer_4 = wx.BoxSizer(wx.HORIZONTAL)
+        sizer_2.Add(self.search_mode, 0, 0, 0)
         sizer_2.Add(self.search_box, 0, wx.ALL, 0)
         sizer_2.Add(self.button_backward, 0, 0, 0)
         sizer_2.Add(self.button_forward, 0, 0, 0)
@@ -70,6 +75,10 @@ class MyFrame(wx.Frame):
         button_name = e.GetEventObject().GetName()
         query = self.search_box.GetValue()
 
+        if (self.search_mode.GetStringSelection() == 'Value'):
+            self.value_search(button_name == 'forward', query)
+            return
+
         if query.startswith('0x'):
             query_addr = query[2:]
         else:
@@ -81,11 +90,7 @@ class MyFrame(wx.Frame):
             else:
                 query_addr = out.split('0x')[1].strip()
 
-        cur_index = self.entries_list_box.GetSelection()
-        if cur_index == wx.NOT_FOUND:
-            cur_ts = 0
-        else:
-            cur_ts = self.entries_list_box.GetClientData(cur_index)[1]
+        cur_ts = self.current_ts()
 
         if (button_name == 'forward'):
             res = self.db_search(cur_ts, query_addr)
@@ -99,6 +104,37 @@ class MyFrame(wx.Frame):
             self.entries_list_box.Set([])
             self.add_to_entries_list_box(res)
 
+    def value_search(self, forward, query):
+        if not self.value_index.exists():
+            wx.MessageDialog(None, "Database has no value index. Run "
+                    "ValueIndex.py on it.", 'Error',
+                    wx.OK | wx.ICON_ERROR).ShowModal()
+            return
+
+        try:
+            query_value = parse_query(query)
+        except ValueError, e:
+            wx.MessageDialog(None, "{0}\nValue should be VALUE, LOW-HIGH or "
+                    "PATTERN/MASK, optionally followed by :WIDTH.".format(e),
+                    'Error', wx.OK | wx.ICON_ERROR).ShowModal()
+            return
+
+        res = self.db_value_search(self.current_ts(), query_value, forward)
+
+        if (len(res) == 0):
+            wx.MessageDialog(None, "Value not found in database.", 'Error',
+                    wx.OK | wx.ICON_ERROR).ShowModal()
+        else:
+            self.entries_list_box.Set([])
+            self.add_to_entries_list_box(res)
+
+    def current_ts(self):
+        cur_index = self.entries_list_box.GetSelection()
+        if cur_index == wx.NOT_FOUND:
+            return 0
+        else:
+            return self.entries_list_box.GetClientData(cur_index)[1]
+
     def add_to_entries_list_box(self, entries):
         for item in entries:
             self.entries_list_box.Append("{0}\t\t\t\t{1}\t\t\t\t{2}".format(item[1],
@@ -146,6 +182,11 @@ Backtrace:\n\n{4}\n".format(entry[2], entry[0], entry[3], entry[4], entry[5])
 
         return results
 
+    def db_value_search(self, ts, query, forward=True, limit=50):
+        ''' query is a (low, high, mask, pattern, width) tuple, see
+        ValueIndex.parse_query. '''
+        return self.value_index.search(ts, query, forward, limit)
+
 
 # end of class MyFrame
 
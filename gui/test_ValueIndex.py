@@ -0,0 +1,126 @@
+import datetime
+import sqlite3
+import unittest
+
+from ValueIndex import ValueIndex, value_rows, parse_query, DENSE_RANGE
+
+T0 = datetime.datetime(2012, 4, 1)
+
+
+def ts(i):
+    return str(T0 + datetime.timedelta(seconds=i))
+
+
+class ValueIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute('CREATE TABLE logs (eip CHAR(8),\
+                timestamp timestamp, mem_addr text, old_data text,\
+                new_data text, bt text, id INTEGER PRIMARY KEY)')
+        self.value_index = ValueIndex(self.conn)
+        self.value_index.setup()
+
+    def add_logs(self, new_datas, start=0):
+        for i, new_data in enumerate(new_datas):
+            self.conn.execute('INSERT INTO logs (eip, timestamp, mem_addr,\
+                    old_data, new_data, bt) VALUES (?,?,?,?,?,?)',
+                    ('c0000000', ts(start + i), '%08x' % (start + i),
+                        '00000000', new_data, ''))
+
+    def search(self, query, at=0, forward=True, limit=50):
+        res = self.value_index.search(at, parse_query(query), forward, limit)
+        return [row[4] for row in res]
+
+    def test_value_rows(self):
+        self.assertEqual(value_rows(1, 't', 'deadbeefabcd'),
+                [(1, 0, 4, 0xdeadbeef, 't'), (1, 4, 2, 0xabcd, 't')])
+        self.assertEqual(value_rows(1, 't', ''), [])
+        self.assertEqual(value_rows(1, 't', 'deadbeefCannot'), [])
+
+    def test_parse_query(self):
+        full = 0xffffffff
+        self.assertEqual(parse_query('0XdeadBEEF'),
+                (0xdeadbeef, 0xdeadbeef, full, 0xdeadbeef, None))
+        self.assertEqual(parse_query(' 16 '), (16, 16, full, 16, None))
+        self.assertEqual(parse_query('0xc1000000-0xc1ffffff'),
+                (0xc1000000, 0xc1ffffff, 0, 0, None))
+        self.assertEqual(parse_query('0x0/0xfff'), (0, full, 0xfff, 0, None))
+        self.assertEqual(parse_query('0xabcd:2'),
+                (0xabcd, 0xabcd, full, 0xabcd, 2))
+        for bad in ['', '0x10-0x5', '1-', '-5', '0x0/0x100000000',
+                '0x100000000', 'foo', '0x1:5', '0x1:']:
+            self.assertRaises(ValueError, parse_query, bad)
+
+    def test_exact(self):
+        self.add_logs(['00000001', '00000002', '0000000100000001',
+            '00000001'])
+        self.value_index.build()
+        # A row matching with two words is returned once
+        self.assertEqual(self.search('0x1'),
+                ['00000001', '0000000100000001', '00000001'])
+        self.assertEqual(self.search('0x3'), [])
+
+    def test_width(self):
+        self.add_logs(['0000abcd', 'abcd'])
+        self.value_index.build()
+        self.assertEqual(self.search('0xabcd'), ['0000abcd', 'abcd'])
+        self.assertEqual(self.search('0xabcd:2'), ['abcd'])
+        self.assertEqual(self.search('0xabcd:4'), ['0000abcd'])
+
+    def test_range(self):
+        self.add_logs(['c0ffffff', 'c1000000', 'c1800000', 'c1ffffff',
+            'c2000000'])
+        self.value_index.build()
+        self.assertEqual(self.search('0xc1000000-0xc1ffffff'),
+                ['c1000000', 'c1800000', 'c1ffffff'])
+
+    def test_mask(self):
+        self.add_logs(['c1000000', 'c1000001', 'c1001000', 'c2000000'])
+        self.value_index.build()
+        self.assertEqual(self.search('0x0/0xfff'),
+                ['c1000000', 'c1001000', 'c2000000'])
+        self.assertEqual(self.search('0xc1000000/0xff000000'),
+                ['c1000000', 'c1000001', 'c1001000'])
+        self.assertEqual(self.search('0xc1000000/0xff000000:2'), [])
+
+    def test_dense_range(self):
+        # Enough entries in the range to walk the trace in time order
+        self.add_logs(['%08x' % (i % 3) for i in range(DENSE_RANGE * 3)])
+        self.value_index.build()
+        self.assertEqual(self.value_index.range_size(1, 2), DENSE_RANGE)
+        res = self.search('0x1-0x2', at=ts(100), limit=4)
+        self.assertEqual(res, ['00000002', '00000001', '00000002',
+            '00000001'])
+        res = self.value_index.search(ts(100), parse_query('0x1-0x2'),
+                limit=4)
+        self.assertEqual([row[1] for row in res],
+                [ts(101), ts(103), ts(104), ts(106)])
+
+    def test_forward_backward(self):
+        self.add_logs(['%08x' % (i % 2) for i in range(10)])
+        self.value_index.build()
+        res = self.value_index.search(ts(4), parse_query('0x1'), limit=2)
+        self.assertEqual([row[1] for row in res], [ts(5), ts(7)])
+        res = self.value_index.search(ts(4), parse_query('0x1'), False, 2)
+        self.assertEqual([row[1] for row in res], [ts(1), ts(3)])
+        res = self.value_index.search(ts(4), parse_query('0x0-0x1'), False)
+        self.assertEqual([row[1] for row in res],
+                [ts(0), ts(1), ts(2), ts(3)])
+
+    def test_build_idempotent(self):
+        self.add_logs(['00000001', '', 'zzzz'])
+        self.assertEqual(self.value_index.build(), 3)
+        self.assertEqual(self.value_index.build(), 0)
+        self.add_logs(['00000001'], start=3)
+        self.assertEqual(self.value_index.build(), 1)
+        self.assertEqual(self.conn.execute('SELECT COUNT(*) FROM\
+                write_values').fetchone()[0], 2)
+        self.assertEqual(len(self.search('0x1')), 2)
+
+    def test_exists(self):
+        self.assertTrue(self.value_index.exists())
+        self.assertFalse(ValueIndex(sqlite3.connect(':memory:')).exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
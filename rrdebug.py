@@ -12,12 +12,23 @@ import sqlite3
 import datetime
 import re
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    'gui'))
+from ValueIndex import ValueIndex
+
 
 class RrDebugger(Cmd):
     def init_db(self):
         self.conn = sqlite3.connect(self.db_file_name)
         self.cursor = self.conn.cursor()
 
+    def init_value_index(self):
+        # Index the rows logged before the value index existed, then keep
+        # it up to date from add_to_db.
+        self.value_index = ValueIndex(self.conn)
+        self.value_index.setup()
+        self.value_index.build()
+
     def setup_db(self):
         #if (os.path.exists(self.db_file_name)):
             #logging.ERROR('DB already exists! Quitting.')
@@ -29,7 +40,8 @@ class RrDebugger(Cmd):
                 mem_addr text,\
                 old_data text,\
                 new_data text,\
-                bt text\
+                bt text,\
+                id INTEGER PRIMARY KEY\
                 )')
         self.cursor.execute('CREATE INDEX eip_index ON logs(eip)')
         self.cursor.execute('CREATE INDEX timestamp ON logs(timestamp)')
@@ -69,12 +81,15 @@ class RrDebugger(Cmd):
         self.db_file_name = 'rrdebug.sqlite'
         self.conn = None
         self.cursor = None
+        self.value_index = None
 
     def add_to_db(self, eip, mem_addr, old_data, mem_size, new_data, bt):
         logging.info("Adding to db: {0}".format(locals()))
         tup = (eip, datetime.datetime.now(), mem_addr, old_data, new_data, bt)
         try:
-            self.cursor.execute('INSERT into logs VALUES (?,?,?,?,?,?)', tup)
+            self.cursor.execute('INSERT into logs (eip, timestamp, mem_addr,\
+                    old_data, new_data, bt) VALUES (?,?,?,?,?,?)', tup)
+            self.value_index.add(self.cursor.lastrowid, tup[1], new_data)
         except sqlite3.IntegrityError, e:
             logging.error("Database raised exception: {0}".format(str(e)))
 
@@ -480,5 +495,6 @@ if __name__ == '__main__':
         else:
             logging.error("DB file not found.")
             sys.exit(-1)
+    dbg.init_value_index()
 
     dbg.cmdloop()